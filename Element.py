@@ -13,8 +13,8 @@ from itertools import chain
 
 # fmt: off
 from pprint import pprint
-from typing import (TYPE_CHECKING, Any, Callable, Iterable, Optional, Protocol, Sequence,
-                    Type, Union)
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Mapping, Optional, Protocol,
+                    Sequence, Type, Union)
 
 import pygame as pg
 
@@ -138,7 +138,7 @@ class Element:
         self.parent = parent
         # parse element style and update default
         self.istyle = Style.parse_inline_style(attrs.get("style", ""))
-        self.estyle = {}
+        self.estyle = Style.Style()
 
     def is_block(self) -> bool:
         """
@@ -168,7 +168,7 @@ class Element:
         return self.box.height if self.box.height != -1 else self.parent.get_height()
 
     @property
-    def input_style(self) -> Style.ResolvedStyle:
+    def input_style(self) -> Mapping[str, str | Style.CompValue]:
         """The total input style. Fused from inline and external style"""
         return Style.remove_important(Style.join_styles(self.istyle, self.estyle))
 
@@ -540,7 +540,7 @@ class MetaElement(Element):
         self.parent = parent
         self.attrs = attrs
         # parse element style and update default
-        self.istyle = {}
+        self.istyle = Style.Style()
 
     def is_block(self):
         return False
@@ -825,15 +825,12 @@ def apply_style():
     )
     root: Element = g["root"]
     for elem in root.iter_desc():
-        # chain all matching styles and sort them by their importance
-        elem.estyle = dict(
-            sorted(
-                chain.from_iterable(
-                    style.items() for selector, style in rules if selector(elem)
-                ),
-                key=lambda t: Style.is_imp(t[1]),
-            )
-        )
+        # join all matching styles. Later rules win unless the earlier value is important
+        estyle = Style.Style()
+        for selector, style in rules:
+            if selector(elem):
+                estyle = Style.join_styles(style, estyle)
+        elem.estyle = estyle
 
 
 ################################# Selectors #######################################
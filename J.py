@@ -3,12 +3,13 @@ from Element import Element, Selector, parse_selector
 
 
 def find_in(elem: Element, selector: Selector) -> Element | None:
-    """Breadth first search in element"""
-    if elem.matches(selector):
-        return elem
-    for c in elem.real_children:
-        if (found := find_in(c, selector)) is not None:
-            return found
+    """Depth first search in element (pre-order)"""
+    stack = [elem]
+    while stack:
+        node = stack.pop()
+        if node.matches(selector):
+            return node
+        stack.extend(node.real_children[::-1])
     return None
 
 
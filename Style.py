@@ -1,16 +1,19 @@
 # fmt: off
 import re
+import string
 from abc import ABC
-from collections import defaultdict
 from contextlib import contextmanager, suppress
-from dataclasses import dataclass
-from functools import cache
+from dataclasses import dataclass, field
+from functools import lru_cache
 from itertools import chain
 from operator import itemgetter
-from typing import (Any, Generic, Iterable, Literal, Mapping, Protocol, TypeVar, Union,
-                    overload)
+from sys import intern
+from types import MappingProxyType
+from typing import (AbstractSet, Any, Callable, Generic, Iterable, Iterator,
+                    Literal, Mapping, Protocol, TypeVar, Union, overload)
 
 import tinycss
+from pygame.colordict import THECOLORS
 
 from config import (abs_border_width, abs_font_size, abs_font_weight,
                     abs_length_units, g, rel_font_size)
@@ -19,8 +22,7 @@ from own_types import (CO_T, V_T, Auto, AutoLP, AutoType, BugError, Color, Drawa
                        FontStyle, Length, LengthPerc, Normal, NormalType,
                        Number, Percentage, Sentinel, Str4Tuple, StrSent,
                        frozendict)
-from util import (dec_re, fetch_txt, get_groups, group_by_bool, log_error,
-                  noop, print_once)
+from util import dec_re, fetch_txt, group_by_bool, log_error, noop, print_once
 # fmt: on
 
 # Typing
@@ -36,16 +38,33 @@ Value = tuple[str | CompValue, bool]
 InputProperty = tuple[str, InputValue]
 Property = tuple[str, Value]
 InputStyle = list[InputProperty]
-Style = dict[str, Value]
 ResolvedStyle = dict[str, str | CompValue]  # Style without important
 FullyComputedStyle = Mapping[str, CompValue]
+
+
+@dataclass(slots=True, unsafe_hash=True)
+class Style:
+    """
+    A processed style.
+    The values and the information which of them are important are stored separately.
+    Only frozen Styles are hashable.
+    """
+
+    values: Mapping[str, str | CompValue] = field(default_factory=dict)
+    imp: AbstractSet[str] = field(default_factory=set)  # the keys of the important values
+
+    def frozen(self) -> "Style":
+        """Returns an immutable copy of the Style"""
+        return Style(frozendict(self.values), frozenset(self.imp))
+
+
 StyleRule = tuple[str, Style]
 """
 A style with a selector
 Example:
 p {
     color: red !important;
-} -> ('p', {'color': ('red', 'True')})
+} -> ('p', Style({'color': 'red'}, {'color'}))
 """
 
 MediaValue = tuple[int, int]  # just the window size right now
@@ -76,16 +95,30 @@ def ensure_comp(x) -> CompValue:
     return CompStr(x) if is_real_str(x) else x
 
 
+# a token is a run of non-whitespace that may contain (non-nested) function brackets
+value_token_re = re.compile(r"(?:[^\s()]|\([^()]*\))+")
+
+
 def split_value(s: str) -> list[str]:
     """
     This function is for splitting css values that include functions
     """
+    tokens = value_token_re.findall(s)
+    if sum(t.count("(") for t in tokens) != s.count("(") or sum(
+        t.count(")") for t in tokens
+    ) != s.count(")"):
+        # nested or unbalanced brackets
+        return _split_value(s)
+    return tokens or [""]
+
+
+def _split_value(s: str) -> list[str]:
     rec = True
     result = []
     curr_string = ""
     brackets = 0
     for c in s:
-        is_w = re.match(r"\s", c)
+        is_w = c.isspace()
         if rec and not brackets and is_w:
             rec = False
             result.append(curr_string)
@@ -127,12 +160,13 @@ corners = ("top-left", "top-right", "bottom-right", "bottom-left")
 
 # fmt: off
 inset_keys = directions
-marg_keys: Str4Tuple = tuple(f"margin-{k}" for k in directions)     # type: ignore[assignment]
-pad_keys: Str4Tuple = tuple(f"padding-{k}" for k in directions)     # type: ignore[assignment]
-bs_keys: Str4Tuple = tuple(f"border-{k}-style" for k in directions) # type: ignore[assignment]
-bw_keys: Str4Tuple = tuple(f"border-{k}-width" for k in directions) # type: ignore[assignment]
-bc_keys: Str4Tuple = tuple(f"border-{k}-color" for k in directions) # type: ignore[assignment]
-br_keys: Str4Tuple = tuple(f"border-{k}-radius" for k in corners)   # type: ignore[assignment]
+# the keys are interned, so that they are identical to the interned names of parsed declarations
+marg_keys: Str4Tuple = tuple(intern(f"margin-{k}") for k in directions)     # type: ignore[assignment]
+pad_keys: Str4Tuple = tuple(intern(f"padding-{k}") for k in directions)     # type: ignore[assignment]
+bs_keys: Str4Tuple = tuple(intern(f"border-{k}-style") for k in directions) # type: ignore[assignment]
+bw_keys: Str4Tuple = tuple(intern(f"border-{k}-width") for k in directions) # type: ignore[assignment]
+bc_keys: Str4Tuple = tuple(intern(f"border-{k}-color") for k in directions) # type: ignore[assignment]
+br_keys: Str4Tuple = tuple(intern(f"border-{k}-radius") for k in corners)   # type: ignore[assignment]
 
 ALPGetter = T4Getter[AutoLP]
 inset_getter: ALPGetter = itemgetter(*inset_keys)   # type: ignore[assignment]
@@ -155,9 +189,12 @@ class Acceptor(Protocol[CompValue_T]):
         ...
 
 
+comma_re = re.compile(r"\s*,\s*")
+
+
 def css_func(value: str, name: str):
     if value.startswith(name + "(") and value.endswith(")"):
-        return re.split(r"\s*,\s*", value.removeprefix(name + "(").removesuffix(")"))
+        return comma_re.split(value.removeprefix(name + "(").removesuffix(")"))
 
 
 def remove_quotes(value: str):
@@ -171,15 +208,37 @@ def remove_quotes(value: str):
 
 
 # https://regexr.com/3ag5b
-hex_re = re.compile(r"#([\da-f]{1,2})([\da-f]{1,2})([\da-f]{1,2})")
-split_units_pattern = re.compile(rf"({dec_re})(\w+|%)")
+# CSS numbers and units are ASCII-only, so we can skip the unicode tables
+hex_re = re.compile(r"#([\da-f]{1,2})([\da-f]{1,2})([\da-f]{1,2})\Z", re.ASCII)
+split_units_pattern = re.compile(rf"({dec_re})(\w+|%)", re.ASCII)
+split_units_match = split_units_pattern.fullmatch  # saves the attribute lookup
 
 
+unit_chars = string.ascii_letters + "%"
+
+
+@lru_cache(maxsize=4096)
 def split_units(attr: str) -> tuple[float, str]:
-    """Split a dimension or percentage into a tuple of number and the "unit" """
+    """
+    Split a dimension or percentage into a tuple of number and the "unit"
+    """
     if attr == "0":
         return (0, "")
-    match = split_units_pattern.fullmatch(attr.strip())
+    attr = attr.strip()
+    # fast path: strip the unit from the right. The regex handles everything unusual
+    num = attr.rstrip(unit_chars)
+    unit = attr[len(num) :]
+    # unitless numbers must be handled here, the regex would split "12" into 1 and "2"
+    # float() would accept whitespace between the number and the unit, the regex does not
+    if (
+        (not unit or unit == "%" or unit.isalpha())
+        and attr.isascii()
+        and "_" not in num
+        and not num[-1:].isspace()
+    ):
+        with suppress(ValueError):
+            return float(num), unit
+    match = split_units_match(attr)
     num, unit = match.groups()  # type: ignore # Raises AttributeError
     return float(num), unit
 
@@ -196,19 +255,48 @@ def background_image(value: str, p_style) -> tuple[Drawable, ...]:
     return tuple(result)
 
 
+THECOLORS.update({"canvastext": (0, 0, 0, 255), "transparent": (0, 0, 0, 0)})
+
+# deletes all whitespace in a single pass (see str.translate)
+whitespace_table = str.maketrans("", "", " \t\n\r\f\v")
+
+
 def color(value: str, p_style):
     if value == "currentcolor":
         return p_style["color"]
+    return parse_color(value)
+
+
+@lru_cache(maxsize=256)
+def parse_color(value: str) -> Color | None:
+    """
+    Parses a color literal.
+    The cached Colors are shared, which is safe because own_types.Color blocks all mutation
+    """
+    value = value.translate(whitespace_table)
     with suppress(ValueError):
-        if args := css_func(value, "rgb"):
-            r, g, b = map(float, args)
-            return Color(*map(round, (r, g, b)))
-        elif args := css_func(value, "rgba"):
-            r, g, b, a = map(float, args)
-            return Color(*map(round, (r, g, b, a*255)))
-        elif groups := get_groups(value.lower(), hex_re):
-            return Color(*map(lambda x: int(x * (2 // len(x)), 16), groups))
+        # fast paths for the most common colors: names, #rgb and #rrggbb
+        if (rgba := THECOLORS.get(value.lower())) is not None:
+            return Color(rgba)
+        elif value.startswith("#") and len(value) in (4, 7):
+            n = len(value) // 3  # hex digits per channel
+            return Color(
+                *(int(value[i : i + n] * (2 // n), 16) for i in range(1, len(value), n))
+            )
+        # the whitespace is already gone, so a plain split is enough
+        elif value.startswith(("rgb(", "rgba(")) and value.endswith(")"):
+            # a single prefix test for both, the fourth character tells them apart
+            if value[3] == "(":
+                r, g, b = value[4:-1].split(",")
+                return Color(round(float(r)), round(float(g)), round(float(b)))
+            r, g, b, a = value[5:-1].split(",")
+            return Color(
+                round(float(r)), round(float(g)), round(float(b)), round(float(a) * 255)
+            )
+        elif match := hex_re.match(value.lower()):
+            return Color(*(int(x * (2 // len(x)), 16) for x in match.groups()))
         return Color(value)
+    return None
 
 
 def number(value: str, p_style):
@@ -264,6 +352,24 @@ def font_style(value: str, p_style):
         return FontStyle(*split)  # type: ignore
 
 
+# source:
+# https://developer.mozilla.org/en-US/docs/Learn/CSS/Building_blocks/Values_and_units
+unit_handlers: dict[str, Callable[[float, FullyComputedStyle], float]] = {
+    # absolute values are converted with abs_length_units directly in _length
+    # relative values --------------------------------------
+    "em": lambda x, p_style: p_style["font-size"] * x,
+    "rem": lambda x, p_style: g["root"]._style["font-size"] * x,
+    # view-port-relative values --------------------------------------
+    "vw": lambda x, p_style: x * 0.01 * g["W"],
+    "vh": lambda x, p_style: x * 0.01 * g["H"],
+    "vmin": lambda x, p_style: x * 0.01 * min(g["W"], g["H"]),
+    "vmax": lambda x, p_style: x * 0.01 * max(g["W"], g["H"]),
+    # TODO: ex, ic, ch, ((lh, rlh, cap)), (vb, vi, sv*, lv*, dv*)
+    # See: https://developer.mozilla.org/en-US/docs/Web/CSS/length#relative_length_units_based_on_viewport
+}
+""" Maps a relative length unit to a function that converts a number of that unit into pixels """
+
+
 def _length(dimension: tuple[float, str], p_style):
     """
     Gets a dimension (a tuple of a number and any unit)
@@ -277,42 +383,20 @@ def _length(dimension: tuple[float, str], p_style):
         return Length(
             0
         )  # we don't even have to look at the unit. Especially because the unit might be the empty string
-    abs_length: dict[str, float] = abs_length_units
-    w: int = g["W"]
-    h: int = g["H"]
-    rv: float
-    match num, s:
-        # source:
-        # https://developer.mozilla.org/en-US/docs/Learn/CSS/Building_blocks/Values_and_units
-        # absolute values first--------------------------------------
-        case x, key if key in abs_length:
-            rv = abs_length[key] * x
-        # now relative values --------------------------------------
-        case x, "em":
-            rv = p_style["font-size"] * x
-        case x, "rem":
-            rv = g["root"]._style["font-size"] * x
-        # view-port-relative values --------------------------------------
-        case x, "vw":
-            rv = x * 0.01 * w
-        case x, "vh":
-            rv = x * 0.01 * h
-        case x, "vmin":
-            rv = x * 0.01 * min(w, h)
-        case x, "vmax":
-            rv = x * 0.01 * max(w, h)
-        # TODO: ex, ic, ch, ((lh, rlh, cap)), (vb, vi, sv*, lv*, dv*)
-        # See: https://developer.mozilla.org/en-US/docs/Web/CSS/length#relative_length_units_based_on_viewport
-        case x, s if isinstance(x, Number) and isinstance(s, str):
+    if (factor := abs_length_units.get(s)) is not None:  # px etc. need no handler
+        return Length(factor * num)
+    if (handler := unit_handlers.get(s)) is None:
+        if isinstance(num, Number) and isinstance(s, str):
             raise ValueError(f"'{s}' is not an accepted unit")
-        case _:
-            raise TypeError()
-    return Length(rv)
+        raise TypeError()
+    return Length(handler(num, p_style))
 
 
 def length(value: str, p_style):
     with suppress(AttributeError):
-        return _length(split_units(value), p_style)
+        num, unit = split_units(value)
+        if unit or num == 0:  # unitless numbers other than 0 are invalid
+            return _length((num, unit), p_style)
 
 
 def length_percentage(value: str, p_style, mult: float | None = None):
@@ -320,7 +404,7 @@ def length_percentage(value: str, p_style, mult: float | None = None):
         num, unit = split_units(value)
         if unit == "%":
             return Percentage(num) if mult is None else Length(mult * Percentage(num))
-        else:
+        elif unit or num == 0:  # unitless numbers other than 0 are invalid
             return _length((num, unit), p_style)
 
 
@@ -349,12 +433,39 @@ def combine_accs(acc1: Acceptor[T1], acc2: Acceptor[T2]) -> Acceptor[T1 | T2]:
 # To add a new style key, document it, add it here and then implement it in the draw or layout methods
 
 
-@dataclass
+def make_accept(
+    kws: Mapping[str, StrSent | CompValue_T], acc: Acceptor[CompValue_T]
+) -> Acceptor[CompValue_T | CompStr | Sentinel]:
+    """
+    Makes the accept function of a StyleAttr.
+    It is specialized so that attributes with only keywords or only an acceptor skip the unused branch
+    """
+    if acc is noop:
+
+        def accept(value: str, p_style: FullyComputedStyle):
+            return ensure_comp(kws.get(value))
+
+    elif not kws:
+
+        def accept(value: str, p_style: FullyComputedStyle):
+            return ensure_comp(acc(value, p_style))
+
+    else:
+
+        def accept(value: str, p_style: FullyComputedStyle):
+            kw = kws.get(value)
+            return ensure_comp(kw if kw is not None else acc(value, p_style))
+
+    return accept
+
+
+@dataclass(slots=True)
 class StyleAttr(Generic[CompValue_T]):
     initial: str
     kws: Mapping[str, StrSent | CompValue_T]
     acc: Acceptor[CompValue_T]
     inherits: bool
+    accept: Acceptor[CompValue_T | CompStr | Sentinel]  # see make_accept
 
     def __init__(
         self,
@@ -370,23 +481,18 @@ class StyleAttr(Generic[CompValue_T]):
         self.initial = initial
         self.kws = self.set2dict(kws) if isinstance(kws, set) else kws
         self.acc = acc
+        self.accept = make_accept(self.kws, acc)
         inherits = acc is not length_percentage if inherits is None else inherits
         self.inherits = (
             inherits if inherits is not None else acc is not length_percentage
         )
 
     def __repr__(self) -> str:
-        return f"StyleAttr(initial={self.initial}, kws={self.kws}, accept={self.accept.__name__}, inherits={self.inherits})"
+        return f"StyleAttr(initial={self.initial}, kws={self.kws}, accept={getattr(self.acc, '__name__', repr(self.acc))}, inherits={self.inherits})"
 
     def set2dict(self, s: set[StrSent]) -> Mapping[str, CompValue_T | StrSent]:
         return {x if isinstance(x, str) else x.value: x for x in s}
 
-    def accept(
-        self, value: str, p_style: FullyComputedStyle
-    ) -> CompValue_T | CompStr | Sentinel | None:
-        kw = self.kws.get(value)
-        return ensure_comp(kw if kw is not None else self.acc(value, p_style))
-
 
 ####### Helpers ########
 
@@ -434,7 +540,7 @@ def no_change(value: str, p_style) -> str:
     return value
 
 
-prio_keys = {"color", "font-size"}  # currentcolor and 1em for example
+prio_keys = frozenset({"color", "font-size"})  # currentcolor and 1em for example
 
 
 style_attrs: dict[str, StyleAttr[CompValue]] = {
@@ -467,43 +573,82 @@ style_attrs: dict[str, StyleAttr[CompValue]] = {
     "outline-offset": StyleAttr("0", acc=length, inherits=False),
 }
 
+style_keys = frozenset(style_attrs)  # for fast membership tests
+
+inheriting_keys = frozenset(k for k, attr in style_attrs.items() if attr.inherits)
+
 abs_default_style: dict[str, str] = {
-    k: "inherit" if v.inherits else v.initial for k, v in style_attrs.items()
+    k: "inherit" if k in inheriting_keys else attr.initial
+    for k, attr in style_attrs.items()
 }
 """ The default style for a value (just like "unset") """
 
-element_styles: dict[str, dict[str, str]] = defaultdict(
-    dict,
-    {
-        "html": {
-            **{k: attr.initial for k, attr in style_attrs.items() if attr.inherits},
-            "display": "block",
-        },
-        # special elements
-        "head": {
-            "display": "none",
-        },
-        "span": {"display": "inline"},
-        "img": {"display": "block"},
-        "h1": {
-            "font-size": "2em",
-            "margin-top": ".67em",
-            "margin-bottom": ".67em",
-            "margin-right": "0",
-            "margin-left": "0",
-        },
-        # "p": {
-        #     "display": "block",
-        #     "margin-top": "1em",
-        #     "margin-bottom": "1em",
-        # },
+
+def compute_independent(attr: StyleAttr, value: str) -> str | CompValue:
+    """
+    Returns the computed value if it can be computed without a parent style.
+    If it depends on the parent style (eg. currentcolor or em) the str is returned instead
+    """
+    with suppress(KeyError):  # the acceptor tried to read from the (empty) parent style
+        if (computed := attr.accept(value, {})) is not None:
+            return computed
+    return value
+
+
+def compute_initial(attr: StyleAttr) -> str | CompValue:
+    """
+    Returns the computed initial value of the attribute.
+    """
+    return compute_independent(attr, attr.initial)
+
+
+abs_default_computed: dict[str, str | CompValue] = {
+    k: "inherit" if k in inheriting_keys else compute_initial(attr)
+    for k, attr in style_attrs.items()
+}
+""" The default style with the initial values already computed where possible """
+
+element_styles: dict[str, dict[str, str]] = {
+    "html": {
+        **{k: attr.initial for k, attr in style_attrs.items() if attr.inherits},
+        "display": "block",
     },
-)
+    # special elements
+    "head": {
+        "display": "none",
+    },
+    "span": {"display": "inline"},
+    "img": {"display": "block"},
+    "h1": {
+        "font-size": "2em",
+        "margin-top": ".67em",
+        "margin-bottom": ".67em",
+        "margin-right": "0",
+        "margin-left": "0",
+    },
+    # "p": {
+    #     "display": "block",
+    #     "margin-top": "1em",
+    #     "margin-bottom": "1em",
+    # },
+}
 
 
-@cache
-def get_style(tag: str) -> ResolvedStyle:
-    return abs_default_style | element_styles[tag]
+# The default styles are flattened and computed (where possible) once per tag and read-only,
+# because they are shared between all elements with that tag
+tag_styles: dict[str, Mapping[str, str | CompValue]] = {
+    intern(tag): MappingProxyType(
+        abs_default_computed
+        | {k: compute_independent(style_attrs[k], v) for k, v in style.items()}
+    )
+    for tag, style in element_styles.items()
+}
+default_tag_style: Mapping[str, str | CompValue] = MappingProxyType(abs_default_computed)
+
+
+def get_style(tag: str) -> Mapping[str, str | CompValue]:
+    """The default style of a tag"""
+    return tag_styles.get(tag, default_tag_style)
 
 
 ###########################  CSS-Parsing ############################
@@ -548,24 +693,29 @@ class PageRule(tinycss.css21.PageRule, AtRule):
 
 def join_styles(style1: Style, style2: Style) -> Style:
     """
-    Join two styles. Prefers the first
+    Join two styles. Prefers the first unless only the second value is important
     """
-    fused = dict(style1)
-    for k, v in style2.items():
-        if k not in fused or (is_imp(v) and not is_imp(fused[k])):
-            fused[k] = v
-    return fused
+    values1 = style1.values
+    imp1 = style1.imp
+    values = dict(values1)
+    for k, v in style2.values.items():
+        if k not in values1 or (k in style2.imp and k not in imp1):
+            values[k] = v
+    return Style(values, imp1 | style2.imp)
 
 
-def is_imp(t: Value):
+def is_imp(t: InputValue):
     return t[1]
 
 
-IMPORTANT = " !important"
+IMPORTANT = "!important"
+IMPORTANT_LEN = len(IMPORTANT)
 
 
 def parse_important(s: str) -> InputValue:
-    return (s[: -len(IMPORTANT)], True) if s.endswith(IMPORTANT) else (s, False)
+    if s.endswith(IMPORTANT):
+        return (s[:-IMPORTANT_LEN].rstrip(), True)
+    return (s, False)
 
 
 @overload
@@ -574,25 +724,20 @@ def remove_important(style: list[Property]) -> list[tuple[str, str]]:
 
 
 @overload
-def remove_important(style: Style) -> ResolvedStyle:
+def remove_important(style: Style) -> Mapping[str, str | CompValue]:
     ...
 
 
 def remove_important(
     style: list[Property] | Style,
-) -> ResolvedStyle | list[tuple[str, str]]:
+) -> Mapping[str, str | CompValue] | list[tuple[str, str]]:
     """
     Remove the information whether a value in the style is important
+    For a Style this returns its values without copying them, so the result must not be mutated
     """
-    d, t = (style, list) if isinstance(style, list) else (style.items(), dict)
-    return t((k, v[0]) for k, v in d)
-
-
-def add_important(style: ResolvedStyle, imp: bool) -> Style:
-    """
-    Add the information whether a value in the style is important
-    """
-    return {k: (v, imp) for k, v in style.items()}
+    if isinstance(style, list):
+        return [(k, v[0]) for k, v in style]
+    return style.values
 
 
 def get_media() -> MediaValue:
@@ -615,11 +760,18 @@ class SourceSheet(list[Rule]):
             if lastmedia == current_media:
                 return lastrules
         rv: list[StyleRule] = []
-        for rule in self:
-            if isinstance(rule, MediaRule) and rule.matches(current_media):
-                rv.extend(rule.rules.all_rules)
-            elif isinstance(rule, tuple):  # Just a regular StyleRule
-                rv.append(rule)
+        # depth first over the nested media rules, keeping the source order
+        stack: list[Iterator[Rule]] = [iter(self)]
+        while stack:
+            for rule in stack[-1]:
+                if isinstance(rule, MediaRule):
+                    if rule.matches(current_media):
+                        stack.append(iter(rule.rules))
+                        break
+                elif isinstance(rule, tuple):  # Just a regular StyleRule
+                    rv.append(rule)
+            else:  # no-break: this sheet is done
+                stack.pop()
         self._last_media_rules = (current_media, rv)
         return rv
 
@@ -657,15 +809,23 @@ def parse_inline_style(s: str) -> Style:
     Self-written right now
     """
     if not s:
-        return {}
+        return Style()
     data = s.removeprefix("{").removesuffix("}").strip().split(";")
-    pre_parsed = [
-        (_split[0], parse_important(":".join(_split[1:])))
-        for value in data
-        if len(_split := tuple(key.strip() for key in value.split(":"))) >= 2
-        or log_error(f"CSS: Invalid style declaration ({value})")
-    ]
-    return process(pre_parsed)
+    return process(iter_declarations(data))
+
+
+def iter_declarations(data: Iterable[str]) -> Iterable[InputProperty]:
+    """
+    Split declarations into their name and value and report the invalid ones
+    """
+    for value in data:
+        if not value or value.isspace():  # eg. after a trailing semicolon
+            continue
+        name, sep, val = value.partition(":")  # values like urls can contain colons
+        if not sep:
+            log_error(f"CSS: Invalid style declaration ({value})")
+            continue
+        yield intern(name.strip()), parse_important(val.strip())
 
 
 def parse_file(source: str) -> SourceSheet:
@@ -699,14 +859,12 @@ def handle_rule(
     if isinstance(rule, tinycss.css21.RuleSet):
         return (
             rule.selector.as_css(),
-            frozendict(
-                process(
-                    [
-                        (decl.name, (decl.value.as_css().strip(), bool(decl.priority)))
-                        for decl in rule.declarations
-                    ]
-                )
-            ),
+            process(
+                [
+                    (intern(decl.name), (decl.value.as_css().strip(), bool(decl.priority)))
+                    for decl in rule.declarations
+                ]
+            ).frozen(),
         )
     elif isinstance(rule, tinycss.css21.MediaRule):
         assert rule.at_keyword == "@media"
@@ -718,12 +876,8 @@ def handle_rule(
 
 
 ###########################  CSS Processing #########################
-from pygame.colordict import THECOLORS
-
-THECOLORS.update({"canvastext": (0, 0, 0, 255), "transparent": (0, 0, 0, 0)})
-
 GlobalValue = Literal["inherit", "initial", "unset", "revert"]
-global_values = ("inherit", "initial", "unset", "revert")
+global_values = frozenset({"inherit", "initial", "unset", "revert"})
 dir_shorthands: dict[str, Str4Tuple] = {
     "margin": marg_keys,
     "padding": pad_keys,
@@ -742,9 +896,9 @@ smart_shorthands = {
     },
     **{
         f"border-{k}": {
-            f"border-{k}-width",
-            f"border-{k}-style",
-            f"border-{k}-color",
+            intern(f"border-{k}-width"),
+            intern(f"border-{k}-style"),
+            intern(f"border-{k}-color"),
         }
         for k in directions
     },
@@ -768,6 +922,7 @@ def is_valid(key: str, value: str) -> None | str | CompValue:
     ...
 
 
+@lru_cache(maxsize=1024)
 def is_valid(key: str, value: str) -> None | str | CompValue:
     """
     Checks whether the given CSS property is valid
@@ -805,12 +960,15 @@ def process_dir(value: list[str]):
     return value + value[1:2] if _len == 3 else value * (4 // _len)
 
 
-# IDEA: cache this
-def process_property(key: str, value: str) -> list[tuple[str, str]] | CompValue | str:
+@lru_cache(maxsize=1024)
+def process_property(
+    key: str, value: str
+) -> frozendict | CompValue | str:
     """
     Processes a single Property
     If this returns a single value it is final
-    If this returns a list all keys should be reprocessed
+    If this returns a frozendict all keys should be reprocessed
+    (expansions are frozendicts, because the results are cached and shared)
     """
     # We do a little style hickup here by using assertions instead of normal raises or Error type returns,
     # but I think that is fine
@@ -821,10 +979,10 @@ def process_property(key: str, value: str) -> list[tuple[str, str]] | CompValue
         assert (
             value in global_values
         ), "'all' can only set global values eg. 'all: unset'"
-        return [(key, value) for key in style_attrs]
+        return frozendict.fromkeys(style_attrs, value)
     elif key == "border-radius" and "/" in value:
         x_y = re.split(r"\s*/\s*", value, 1)
-        return list(
+        return frozendict(
             zip(
                 br_keys,
                 (
@@ -834,13 +992,13 @@ def process_property(key: str, value: str) -> list[tuple[str, str]] | CompValue
             )
         )
     elif (keys := dir_shorthands.get(key)) is not None:
-        return list(zip(keys, process_dir(arr)))
+        return frozendict(zip(keys, process_dir(arr)))
     elif (shorthand := smart_shorthands.get(key)) is not None:
         assert len(arr) <= len(
             shorthand
         ), f"Too many values: {len(arr)}, max {len(shorthand)}"
         if len(arr) == 1 and (global_value := arr[0]) in global_values:
-            return dict.fromkeys(shorthand, global_value)
+            return frozendict.fromkeys(shorthand, global_value)
         _shorthand = shorthand.copy()
         result: list[tuple[str, str]] = []
         for sub_value in arr:
@@ -851,38 +1009,47 @@ def process_property(key: str, value: str) -> list[tuple[str, str]] | CompValue
                 raise AssertionError(f"Invalid value found in shorthand 'sub_value'")
             _shorthand.remove(k)
             result.append((k, sub_value))
-        return result
+        return frozendict(result)
     else:
-        assert key in style_attrs, "Unknown Property"
+        assert key in style_keys, "Unknown Property"
         assert (new_val := is_valid(key, value)) is not None, "Invalid Value"
         return new_val
 
 
+def clear_value_caches():
+    """
+    Clears the caches of is_valid and process_property.
+    Their results can depend on the config (eg. vw on g["W"]) and on loaded media (background-image),
+    so they have to be cleared when the window is resized or the page is reloaded
+    """
+    is_valid.cache_clear()
+    process_property.cache_clear()
+
+
 def process_input(d: list[tuple[str, str]]):
     """
     Unpacks shorthands and filters and reports invalid declarations
     """
     done: dict[str, CompValue] = {}
-    todo: list[tuple[str, str]] = d
+    # a stack, so that shorthands are expanded in place and later declarations still win
+    todo: list[tuple[str, str]] = d[::-1]
     while todo:
-        _todo = todo
-        todo = []
-        for k, v in _todo:
-            try:
-                processed = process_property(k, v)
-                if isinstance(processed, list):
-                    todo.extend(processed)
-                else:
-                    done[k] = processed
-            except BugError:
-                raise
-            except AssertionError as e:
-                reason = e.args[0] if e.args else "Invalid Property"
-                log_error(f"CSS: {reason} ({k}: {v})")
+        k, v = todo.pop()
+        try:
+            processed = process_property(k, v)
+            if isinstance(processed, frozendict):
+                todo.extend(reversed(processed.items()))
+            else:
+                done[k] = processed
+        except BugError:
+            raise
+        except AssertionError as e:
+            reason = e.args[0] if e.args else "Invalid Property"
+            log_error(f"CSS: {reason} ({k}: {v})")
     return done
 
 
-def process(d: InputStyle) -> Style:
+def process(d: Iterable[InputProperty]) -> Style:
     """
     Take an InputStyle and process it into a Style
     """
@@ -890,7 +1057,7 @@ def process(d: InputStyle) -> Style:
         lambda x: process_input(remove_important(x)),
         group_by_bool(d, lambda t: is_imp(t[1])),
     )
-    return add_important(nimp, False) | add_important(imp, True)
+    return Style(nimp | imp, set(imp))
 
 
 def compute_style(
@@ -21,6 +21,7 @@ from config import g, reset_config, watch_file
 from Element import HTMLElement, apply_style, create_element
 from J import J, SingleJ  # for console
 import Media
+import Style
 from own_types import Surface, Vector2
 
 # setup
@@ -92,6 +93,7 @@ async def main(file: str):
         raise RuntimeError("Already running")
     running = True
     reset_config()
+    Style.clear_value_caches()
     g["file_watcher"] = util.FileWatcher()
     file = watch_file(file)
     html = util.fetch_txt(file)
@@ -118,6 +120,7 @@ async def main(file: str):
             elif event.type == pg.WINDOWRESIZED:
                 g["W"] = event.x
                 g["H"] = event.y
+                Style.clear_value_caches()
                 g["recompute"] = True
         if end:
             break
@@ -206,6 +206,15 @@ class Color(pg.Color):
     def __setattr__(self, __name: str, __value: Any) -> None:
         raise TypeError("Color can't be mutated")
 
+    def __setitem__(self, __key: Any, __value: Any) -> None:
+        raise TypeError("Color can't be mutated")
+
+    def update(self, *args, **kwargs) -> None:
+        raise TypeError("Color can't be mutated")
+
+    def set_length(self, __length: int) -> None:
+        raise TypeError("Color can't be mutated")
+
     def __hash__(self):
         return hash(int(self))
 
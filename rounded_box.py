@@ -1,28 +1,20 @@
 # fmt: off
 import math
-from functools import cache
 from typing import Sequence
 
-import numpy as np
 import pygame as pg
 from pygame import gfxdraw
 
 from own_types import (V_T, BugError, Color, Dimension, Float4Tuple, Radii, Rect,
                        Surface, Vector2)
-from util import all_equal
+from util import lru_get
 # fmt: on
 
-def mul_tup(tup1: Dimension, tup2: Dimension) -> tuple[float, float]:
-    x1, y1 = tup1
-    x2, y2 = tup2
-    return (x1 * x2, y1 * y2)
-
-
-def abs_tup(tup1: Dimension) -> Dimension:
-    return type(tup1)([abs(x) for x in tup1])  # type: ignore
-
-
 side_vectors: list[tuple[int, int]] = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+abs_side_vectors: list[tuple[int, int]] = [(abs(x), abs(y)) for x, y in side_vectors]
+# the side vectors rotated by 90 degrees
+counter_vectors: list[Vector2] = [Vector2(-y, x) for x, y in side_vectors]
+abs_counter_vectors: list[tuple[int, int]] = [(abs(y), abs(x)) for x, y in side_vectors]
 
 corner_vectors: list[tuple[int, int]] = [
     (1, 1),  # topleft
@@ -32,16 +24,6 @@ corner_vectors: list[tuple[int, int]] = [
 ]
 
 
-def counter_vector(vector: Dimension) -> Vector2:
-    r: tuple[float, float]
-    match tuple(vector):
-        case (x, 0):
-            r = (0, x)
-        case (0, x):
-            r = (-x, 0)
-    return Vector2(r)
-
-
 _side2corners = (
     (0, 3),  # top then left
     (0, 1),  # top then right
@@ -85,11 +67,29 @@ def adj_corners(corners: list[V_T]) -> list[tuple[V_T, V_T]]:
     return [(corners[i1], corners[i2]) for i1, i2 in _corner2sides]
 
 
-@cache
+_ellipse_cache: dict[int, Surface] = {}
+max_cached_ellipses = 512
+
+
 def full_ellipse(size: tuple[int, int], color: Color, width: int) -> Surface:
     """
-    Returns a surface with an ellipse drawn in it.
+    Returns a surface with an ellipse drawn in it. Cached.
     """
+    w, h = size
+    if h >> 16 or width >> 16:  # too large to be packed into the key
+        return _draw_ellipse(size, color, width)
+    # pack everything into a single int:
+    # 32 bits for the color, 16 bits each for the line width and h, and w on top
+    key = (((w << 16 | h) << 16 | width) << 32) | int(color)
+    return lru_get(
+        _ellipse_cache,
+        key,
+        lambda: _draw_ellipse(size, color, width),
+        max_cached_ellipses,
+    )
+
+
+def _draw_ellipse(size: tuple[int, int], color: Color, width: int) -> Surface:
     surface = pg.Surface(size, flags=pg.SRCALPHA)
     rect = Rect(0, 0, *size)
     if width == 0:
@@ -114,12 +114,19 @@ def draw_rounded_border(
     widths: tuple[int, int, int, int] = tuple(int(x) for x in widths)  # type: ignore
     if not any(widths):
         return
-    if all_equal(widths) and all_equal(colors) and all(r1 == r2 for r1, r2 in radii):
-        new_radii: list[int] = [r1 for r1, _ in radii]
-        if all_equal(new_radii):
-            pg.draw.rect(surf, colors[0], box, widths[0], new_radii[0])
+    (r0x, r0y), (r1x, r1y), (r2x, r2y), (r3x, r3y) = radii
+    if (
+        widths[0] == widths[1] == widths[2] == widths[3]
+        and colors[0] == colors[1] == colors[2] == colors[3]
+        and r0x == r0y
+        and r1x == r1y
+        and r2x == r2y
+        and r3x == r3y
+    ):
+        if r0x == r1x == r2x == r3x:
+            pg.draw.rect(surf, colors[0], box, widths[0], r0x)
         else:
-            pg.draw.rect(surf, colors[0], box, widths[0], -1, *new_radii)
+            pg.draw.rect(surf, colors[0], box, widths[0], -1, r0x, r1x, r2x, r3x)
     else:
         # advanced border draw
         def draw_rect(color, rect):
@@ -130,28 +137,48 @@ def draw_rounded_border(
 
         corners = [Vector2(x) for x in box.corners]
         vectors = [
-            Vector2(mul_tup(vec, rad)) for vec, rad in zip(corner_vectors, radii)
+            Vector2(vx * rx, vy * ry)
+            for (vx, vy), (rx, ry) in zip(corner_vectors, radii)
         ]
+        # the index patterns of side2corners and adj_corners, unrolled
+        top_c, right_c, bottom_c, left_c = colors
+        top_w, right_w, bottom_w, left_w = widths
+        tl, tr, br, bl = corners
+        tl_v, tr_v, br_v, bl_v = vectors
         for corner, vec, ecolors, ewidths in zip(
-            corners, vectors, side2corners(colors), side2corners(widths)
+            corners,
+            vectors,
+            (
+                (top_c, left_c),
+                (top_c, right_c),
+                (bottom_c, right_c),
+                (bottom_c, left_c),
+            ),
+            (
+                (top_w, left_w),
+                (top_w, right_w),
+                (bottom_w, right_w),
+                (bottom_w, left_w),
+            ),
         ):
             angle_vec = vec * -1
+            ax, ay = angle_vec
+            # negated, because the y-axis points down
+            # multiplying by 0 keeps the signed zeros of the single axis vectors
+            x_angle = -math.atan2(ay * 0, ax)
+            y_angle = -math.atan2(ay, ax * 0)
+            mid_angle = -math.atan2(ay, ax)
             corner_rect = Rect.from_span(corner, corner + vec)
             ell_rect = Rect.from_span(corner, corner + 2 * vec)
-            _, x_angle = Vector2(mul_tup(angle_vec, (1, 0))).as_polar()
-            _, y_angle = Vector2(mul_tup(angle_vec, (0, 1))).as_polar()
-            _, mid_angle = angle_vec.as_polar()
-            x_angle, y_angle, mid_angle = (
-                math.radians(-x) for x in (x_angle, y_angle, mid_angle)
-            )
             switch = vec.x * vec.y > 0
             start_angle, stop_angle = (
                 (y_angle, x_angle) if switch else (x_angle, y_angle)
             )
             if all(ewidths):
-                if all_equal(ewidths) and all_equal(ecolors):
+                if ewidths[0] == ewidths[1] and ecolors[0] == ecolors[1]:
                     # draw a single arc
-                    ellipse = full_ellipse(ell_rect.size, ecolors[0], ewidths[0])
+                    # the widths were converted to ints above
+                    ellipse = full_ellipse(ell_rect.size, ecolors[0], ewidths[0])  # type: ignore
                     ell_center = ellipse.get_rect().center
                     surf.blit(
                         ellipse,
@@ -170,14 +197,16 @@ def draw_rounded_border(
                         # TODO: find solution (for example creating an svg file on the fly in memory and loading it in)
                         draw_arc(color, ell_rect, *angles, width)
 
-        for vector, adjcorners, adjvectors, color, width in zip(
-            side_vectors, adj_corners(corners), adj_corners(vectors), colors, widths
+        for (ax, ay), counter, adjcorners, (v0, v1), color, width in zip(
+            abs_side_vectors,
+            counter_vectors,
+            ((tl, tr), (tr, br), (br, bl), (bl, tl)),
+            ((tl_v, tr_v), (tr_v, br_v), (br_v, bl_v), (bl_v, tl_v)),
+            colors,
+            widths,
         ):
-            absvec = abs_tup(vector)
-            startpoint, stoppoint = adjcorners[0] + mul_tup(
-                absvec, adjvectors[0]
-            ), adjcorners[1] + mul_tup(absvec, adjvectors[1])
-            counter = counter_vector(vector)
+            startpoint = adjcorners[0] + (ax * v0[0], ay * v0[1])
+            stoppoint = adjcorners[1] + (ax * v1[0], ay * v1[1])
             draw_rect(color, Rect.from_span(startpoint, stoppoint + counter * width))
 
 
@@ -187,12 +216,12 @@ def draw_rounded_background(
     """
     Draw just a solid color background
     """
-    if all(r1 == r2 for r1, r2 in radii):
-        new_radii: list[int] = [r1 for r1, _ in radii]
-        if all_equal(new_radii):
-            pg.draw.rect(surf, bgcolor, box, border_radius=new_radii[0])
+    (r0x, r0y), (r1x, r1y), (r2x, r2y), (r3x, r3y) = radii
+    if r0x == r0y and r1x == r1y and r2x == r2y and r3x == r3y:
+        if r0x == r1x == r2x == r3x:
+            pg.draw.rect(surf, bgcolor, box, border_radius=r0x)
         else:
-            pg.draw.rect(surf, bgcolor, box, 0, -1, *new_radii)
+            pg.draw.rect(surf, bgcolor, box, 0, -1, r0x, r1x, r2x, r3x)
     else:
 
         def draw_rect(color, rect):
@@ -201,38 +230,31 @@ def draw_rounded_background(
 
         corners = [Vector2(x) for x in box.corners]
         vectors = [
-            Vector2(mul_tup(vec, rad)) for vec, rad in zip(corner_vectors, radii)
+            Vector2(vx * rx, vy * ry)
+            for (vx, vy), (rx, ry) in zip(corner_vectors, radii)
         ]
-        # draw the corners
-        for corner, vec in zip(corners, vectors):
-            angle_vec = vec * -1
-            corner_rect = Rect.from_span(corner, corner + vec)
-            ell_rect = Rect.from_span(corner, corner + 2 * vec)
-            ellipse = full_ellipse(ell_rect.size, bgcolor, 0)
-            ell_center = ellipse.get_rect().center
-            surf.blit(
-                ellipse,
-                corner_rect.topleft,
-                Rect.from_span(ell_center, angle_vec + ell_center),
-            )
+        # draw the corners (corners with the same radii share one ellipse)
+        # the box and the radii are integral, so this is plain int arithmetic
+        ellipses: dict[tuple[int, int], Surface] = {}
+        for (cx, cy), (sx, sy), (rx, ry) in zip(box.corners, corner_vectors, radii):
+            ell_size = (2 * rx, 2 * ry)
+            if (ellipse := ellipses.get(ell_size)) is None:
+                ellipse = ellipses[ell_size] = full_ellipse(ell_size, bgcolor, 0)
+            # offset of the corner's quarter in the ellipse
+            ox = rx if sx < 0 else 0
+            oy = ry if sy < 0 else 0
+            surf.blit(ellipse, (cx - ox, cy - oy), (ox, oy, rx, ry))
         # draw the rects between the sides and the corners
-        for vector, adjcorners, adjvectors in zip(
-            side_vectors, adj_corners(corners), adj_corners(vectors)
+        for (ax, ay), (cx, cy), adjcorners, (v0, v1) in zip(
+            abs_side_vectors,
+            abs_counter_vectors,
+            adj_corners(corners),
+            adj_corners(vectors),
         ):
-            absvec = abs_tup(vector)
-            startpoint, stoppoint = adjcorners[0] + mul_tup(
-                absvec, adjvectors[0]
-            ), adjcorners[1] + mul_tup(absvec, adjvectors[1])
-            counter = counter_vector(vector)
-            abscounter = abs_tup(counter)
-            draw_rect(
-                bgcolor,
-                Rect.from_span(
-                    startpoint,
-                    stoppoint
-                    + max((mul_tup(abscounter, x) for x in adjvectors), key=len),
-                ),
-            )
+            startpoint = adjcorners[0] + (ax * v0[0], ay * v0[1])
+            stoppoint = adjcorners[1] + (ax * v1[0], ay * v1[1])
+            endpoint = stoppoint + (cx * v0[0], cy * v0[1])
+            draw_rect(bgcolor, Rect.from_span(startpoint, endpoint))
         # draw the center part
         draw_rect(
             bgcolor, Rect.from_span(corners[0] + vectors[0], corners[2] + vectors[2])
@@ -250,7 +272,8 @@ def round_surf(surf: Surface, size: Dimension, radii: tuple[tuple[int, int], ...
     assert size == box.size, BugError(f"Surface is not equal to box")
     surf.convert_alpha()
     clip_surf = Surface(size, flags=pg.SRCALPHA)
-    draw_rounded_background(clip_surf, box, Color("black"), radii)
-    # here we need to copy the alpha value from the clip_surf to the surface
-    surf_alpha = pg.surfarray.pixels_alpha(surf)
-    np.copyto(surf_alpha, src=pg.surfarray.pixels_alpha(clip_surf))
+    # the mask is white so that the min blend only affects the alpha channel
+    clip_surf.fill((255, 255, 255, 0))
+    draw_rounded_background(clip_surf, box, Color("white"), radii)
+    # here we need to clip the alpha value of the surface with the alpha value of the clip_surf
+    surf.blit(clip_surf, (0, 0), special_flags=pg.BLEND_RGBA_MIN)
@@ -9,6 +9,7 @@ import requests
 from pytest import raises
 
 import Box
+import config
 import Element
 import J
 import rounded_box
@@ -67,6 +68,13 @@ def test_joint():
 def test_own_types():
     # clock-wise rotation
     assert Rect(0, 0, 400, 400).corners == ((0, 0), (400, 0), (400, 400), (0, 400))
+    # Colors are shared (eg. by the color cache), so they must not be mutable
+    red = Color("red")
+    with raises(TypeError):
+        red[0] = 5
+    with raises(TypeError):
+        red.update(1, 2, 3)
+    assert red == Color(255, 0, 0)
 
 
 def test_cache():
@@ -102,8 +110,22 @@ def test_style_computing():
     assert Style.split_units("70%") == (70, "%")
     with pytest.raises(AttributeError):
         Style.split_units("blue")
+    assert Style.split_units("12") == (12, "")
+    assert Style.split_units("-1.5") == (-1.5, "")
+    assert Style.split_units(" 1.5em ") == (1.5, "em")
+    for value in ("12 px", "12\tpx", "5 %"):
+        with pytest.raises(AttributeError):
+            Style.split_units(value)
 
     assert Style.length("3px", {}) == Length(3)
+    assert Style.length("1in", {}) == Length(96)
+    assert Style.length("2em", {"font-size": 10}) == Length(20)
+    assert Style.length("10vw", {}) == Length(0.1 * config.g["W"])
+    with raises(ValueError):
+        Style.length("3zz", {})
+    # unitless numbers other than 0 are not lengths
+    assert Style.length("12", {}) is None
+    assert Style.length("0", {}) == Length(0)
 
     assert Style.color("rgb(120,120,120)", {}) == Color(*(120,) * 3)
     assert Style.style_attrs["color"].accept("rgb(120,120,120)", {}) == Color(
@@ -119,8 +141,12 @@ def test_style_computing():
         "rgb(11, 18, 147)",
         "3px",
     ]
+    assert Style.split_value("calc(1px + (2px)) auto") == ["calc(1px + (2px))", "auto"]
     with raises(KeyError):
         Style.style_attrs["width"].accept("3em",{})
+    assert Style.style_attrs["width"].accept("auto", {}) is Auto
+    assert Style.style_attrs["display"].accept("block", {}) == "block"
+    assert Style.style_attrs["display"].accept("3px", {}) is None
     # TODO
     with raises(AssertionError):
         assert (
@@ -137,11 +163,40 @@ def test_style_computing():
 
     # TODO: Add some more complex tests
     assert Style.remove_important(
-        Style.join_styles({"color": ("red", False)}, {"color": ("blue", False)})
+        Style.join_styles(Style.Style({"color": "red"}), Style.Style({"color": "blue"}))
     ) == {"color": "red"}
     assert Style.remove_important(
-        Style.join_styles({"color": ("red", False)}, {"color": ("blue", True)})
+        Style.join_styles(
+            Style.Style({"color": "red"}), Style.Style({"color": "blue"}, {"color"})
+        )
     ) == {"color": "blue"}
+    assert Style.join_styles(
+        Style.Style({"color": "red"}, {"color"}), Style.Style({"color": "blue"}, {"color"})
+    ) == Style.Style({"color": "red"}, {"color"})
+    assert Style.parse_inline_style("color: red !important; width: 0") == Style.Style(
+        {"color": Color("red"), "width": Length(0)}, {"color"}
+    )
+    # the value caches depend on the viewport size
+    width = config.g["W"]
+    assert Style.parse_inline_style("width: 10vw").values["width"] == Length(0.1 * width)
+    try:
+        config.g["W"] = 2000
+        Style.clear_value_caches()
+        assert Style.parse_inline_style("width: 10vw").values["width"] == Length(200)
+    finally:
+        config.g["W"] = width
+        Style.clear_value_caches()
+    # the default tag styles are computed unless they depend on the parent style
+    assert Style.get_style("h1")["margin-left"] == Length(0)
+    assert Style.get_style("h1")["margin-top"] == ".67em"
+    assert Style.get_style("unknown-tag") is Style.get_style("div")
+    # invalid declarations are dropped
+    for decl in ("width: 5", "margin: 1.5", "margin: -12", "width: +3"):
+        assert Style.parse_inline_style(decl) == Style.Style()
+    # shorthands are expanded in place
+    assert Style.remove_important(
+        Style.parse_inline_style("margin: 0; margin-top: 5px")
+    )["margin-top"] == Length(5)
 
     # https://developer.mozilla.org/en-US/docs/Web/CSS/margin#syntax
     assert Style.process_dir(["1em"]) == ["1em", "1em", "1em", "1em"]
@@ -178,6 +233,8 @@ def test_style_computing():
     assert Style.is_valid("border-color", "black") is not None
     assert dict(Style.process_property("border", "solid")) == {"border-style": Style.CompStr("solid")}
     assert Style.process_property("width", "15px") == Length(15)
+    # computed values can be tuples too, these must not be mistaken for shorthands
+    assert Style.process_property("border-top-left-radius", "4px") == (Length(4),) * 2
 
 
 def test_selector_parsing():
@@ -203,6 +260,8 @@ def test_selector_parsing():
             ),
         )
     )
+    # repeated queries (eg. from J) reuse the parsed selector
+    assert parse_selector("div > a#hello.dark[target]") is selector
 
 
 def test_boxes():
@@ -289,6 +348,12 @@ def test_util():
 
     closest_to(300, 150, 450) == 450
 
+    cache = {}
+    for key in (1, 2, 1, 3):  # accessing 1 again makes 2 the least recently used entry
+        util.lru_get(cache, key, lambda: key * 10, 2)
+    assert cache == {1: 10, 3: 30}
+    assert util.lru_get(cache, 1, lambda: 0, 2) == 10
+
 
 def test_rounded_box():
     assert rounded_box.side2corners(
@@ -13,6 +13,7 @@ from contextlib import contextmanager, redirect_stdout, suppress
 from dataclasses import dataclass
 from functools import cache
 from os.path import abspath, dirname
+from sys import intern
 from types import FunctionType
 from typing import Any, Callable, Iterable, Sequence
 from urllib.error import URLError
@@ -173,7 +174,8 @@ def get_tag(elem: _XMLElement) -> str:
     Get the tag of an _XMLElement or "comment" if the element has no valid tag
     """
     return (
-        elem.tag.removeprefix("{http://www.w3.org/1999/xhtml}").lower()
+        # interned so that tag lookups (eg. in get_style) can compare by identity
+        intern(elem.tag.removeprefix("{http://www.w3.org/1999/xhtml}").lower())
         if isinstance(elem.tag, str)
         else "comment"
     )
@@ -237,6 +239,22 @@ def consume_dict(d: dict[K_T, V_T]):
         yield d.popitem()
 
 
+def lru_get(
+    cache: dict[K_T, V_T], key: K_T, make: Callable[[], V_T], maxsize: int
+) -> V_T:
+    """
+    Get a value from a dict that is used as a bounded LRU cache.
+    On a miss the value is made and the least recently used entry is evicted if the cache is full
+    """
+    # dicts keep the insertion order, so reinserting on every access keeps the oldest entry in front
+    if (value := cache.pop(key, None)) is None:
+        if len(cache) >= maxsize:
+            del cache[next(iter(cache))]
+        value = make()
+    cache[key] = value
+    return value
+
+
 ####################################################################
 
 ############################## I/O #################################